@@ -26,15 +26,10 @@ pageId は IP アドレスのようなもの → URL を与える
 
 
 from typing import Type, Union
-import copy
+from collections import OrderedDict, defaultdict
+from array import array
 import random
-import queue
-
-
-# set から要素を一つ取り出す関数
-def getMember(s: set) -> any:
-    for m in s:
-        return m
+import weakref
 
 
 # set から要素をランダムに一つ取り出す関数
@@ -43,47 +38,555 @@ def getRandomMember(s: set) -> any:
     return random.choice(l)
 
 
-# 集合のリストから、リスト内の全ての集合の和集合を得る関数
-def mergeSets(l: list[set]) -> set:
-    v = set()
-    for s in l:
-        v |= s
-    return v
+# 与えられた str が int 形式に変換可能かを返す関数
+def isint(i: str) -> bool:
+    try:
+        int(i)
+    except ValueError:
+        return False
+    else:
+        return True
+
 
+# ——— CSR（圧縮行格納）表現上の探索 ———
+# ページは 0 から始まる連番で表され、番号 i のページのリンク先は indices[indptr[i]:indptr[i+1]] に並ぶ
+# 引数が整数とその配列のみなので、辞書や集合を介さずに辿ることができる
+# indptr と indices は連続した整数の配列（array）で、リンク1本あたり4バイトしか占めない
 
-# リストに指定された要素が含まれればその index を、なければ -1 を返す
-def find(l: list, i: any) -> int:
-    if i in l:
-        return l.index(i)
-    else:
-        return -1
+
+# 始点から到達可能なページの番号のリストを返す（始点は閉路上にある場合のみ含まれる）
+# marks[i] == mark であるページを周回済とみなす（marks を省略すると新たに確保する）
+def searchDescendantsCSR(indptr: list[int], indices: list[int], origin: int,
+                         marks: list[int] = None, mark: int = 1) -> list[int]:
+    if marks is None:
+        marks = bytearray(len(indptr) - 1)
+    
+    descendants = []
+    stack = [origin]
+    
+    # 始点自身は周回済にしないので、閉路を通って戻ってきた場合にのみ含まれる
+    while stack:
+        location = stack.pop()
+        
+        # 未周回のリンク先のみを、周回済にしてから積む
+        for destination in indices[indptr[location]:indptr[location+1]]:
+            if marks[destination] != mark:
+                marks[destination] = mark
+                descendants.append(destination)
+                stack.append(destination)
+    
+    return descendants
+
+
+# 始点から各ページまでの距離（最短のリンク数）のリストを返す（到達できなければ -1）
+# 同じ距離のページ（frontier）をまとめて処理するので、距離はループの回数そのものとなる
+def searchDistancesCSR(indptr: list[int], indices: list[int], start: int) -> list[int]:
+    # 距離が -1 のページを未周回とみなす
+    distances = [-1] * (len(indptr) - 1)
+    distances[start] = 0
+    frontier = [start]
+    depth = 0
+    
+    while frontier:
+        depth += 1
+        nextFrontier = []
+        
+        for location in frontier:
+            for destination in indices[indptr[location]:indptr[location+1]]:
+                if distances[destination] == -1:
+                    distances[destination] = depth
+                    nextFrontier.append(destination)
+        
+        frontier = nextFrontier
+    
+    return distances
+
+
+# 始点から各ページまでの距離のリストを、ページの集合を整数のビット列で表して求める（到達できなければ -1）
+# rows[i] は番号 i のページのリンク先を表すビット列で、一度の OR で 1 ページ分のリンク先をまとめて frontier に加える
+# リンクが密なハイパーテキストでは、リンクを1本ずつ辿る searchDistancesCSR より速い
+def searchDistancesBitset(rows: list[int], start: int) -> list[int]:
+    distances = [-1] * len(rows)
+    visited = frontier = 1 << start
+    depth = 0
+    
+    while frontier:
+        nextFrontier = 0
+        
+        # frontier の各ビット（ページ）を下位から順に取り出す
+        while frontier:
+            lowest = frontier & -frontier
+            location = lowest.bit_length() - 1
+            distances[location] = depth
+            nextFrontier |= rows[location]
+            frontier ^= lowest
+        
+        depth += 1
+        frontier = nextFrontier & ~visited
+        visited |= frontier
+    
+    return distances
+
+
+# 始点から終点までの距離を、始点からの順方向と終点からの逆方向の幅優先探索を交互に進めて求める（到達できなければ -1）
+# 両側の探索が出会った時点で打ち切るので、探索するページ数は片側だけの探索のおよそ平方根で済む
+def searchDistanceBidirectionalCSR(indptr: list[int], indices: list[int],
+                                   transposeIndptr: list[int], transposeIndices: list[int],
+                                   start: int, end: int) -> int:
+    if start == end:
+        return 0
+    
+    # 各側で発見したページとその側の端点からの距離
+    forward = {start: 0}
+    backward = {end: 0}
+    forwardFrontier = [start]
+    backwardFrontier = [end]
+    
+    while forwardFrontier and backwardFrontier:
+        # frontier の小さい方の側を一段階進める
+        if len(forwardFrontier) <= len(backwardFrontier):
+            frontier, ptr, idx, distances, others = forwardFrontier, indptr, indices, forward, backward
+        else:
+            frontier, ptr, idx, distances, others = backwardFrontier, transposeIndptr, transposeIndices, backward, forward
+        
+        nextFrontier = []
+        shortest = -1
+        
+        for location in frontier:
+            depth = distances[location] + 1
+            
+            for destination in idx[ptr[location]:ptr[location+1]]:
+                if destination not in distances:
+                    distances[destination] = depth
+                    nextFrontier.append(destination)
+                    
+                    # 反対側で発見済のページに出会えば経路が繋がる
+                    if destination in others and (shortest == -1 or depth + others[destination] < shortest):
+                        shortest = depth + others[destination]
+        
+        # 段階の途中で出会っても、段階を終えてから最短のものを返す
+        if shortest != -1:
+            return shortest
+        
+        if distances is forward:
+            forwardFrontier = nextFrontier
+        else:
+            backwardFrontier = nextFrontier
+    
+    return -1
+
+
+# CSR 表現の転置（全てのリンクを反転させたもの）を (indptr, indices) の組として返す
+# リンク先ごとにリンクの本数を数えてから、各リンクをその位置に振り分ける（計数ソート）
+def transposeCSR(indptr: list[int], indices: list[int]) -> tuple[array, array]:
+    n = len(indptr) - 1
+    counts = [0] * (n + 1)
+    
+    for destination in indices:
+        counts[destination + 1] += 1
+    
+    for i in range(n):
+        counts[i + 1] += counts[i]
+    
+    transposeIndptr = array("i", counts)
+    transposeIndices = array("i", [0]) * len(indices)
+    position = counts[:-1]  # 各ページの行で次に書き込む位置
+    
+    # リンク元の番号順に振り分けるので、転置後の各行も番号順に並ぶ
+    for location in range(n):
+        for destination in indices[indptr[location]:indptr[location+1]]:
+            transposeIndices[position[destination]] = location
+            position[destination] += 1
+    
+    return (transposeIndptr, transposeIndices)
+
+
+# 各ページが属する強連結成分の番号のリストと、成分の個数を返す（Kosaraju のアルゴリズム）
+# 帰りがけ順を求める深さ優先探索と、その逆順に転置グラフを辿る探索の二段階からなる
+def searchSCCsKosarajuCSR(indptr: list[int], indices: list[int],
+                          transposeIndptr: list[int], transposeIndices: list[int]) -> tuple[list[int], int]:
+    n = len(indptr) - 1
+    visited = bytearray(n)
+    position = indptr[:-1]
+    finishOrder = []
+    
+    # 帰りがけ順に並べる
+    for root in range(n):
+        if visited[root]:
+            continue
+        
+        visited[root] = 1
+        stack = [root]
+        
+        while stack:
+            location = stack[-1]
+            
+            if position[location] < indptr[location+1]:
+                destination = indices[position[location]]
+                position[location] += 1
+                
+                if not visited[destination]:
+                    visited[destination] = 1
+                    stack.append(destination)
+            else:
+                stack.pop()
+                finishOrder.append(location)
+    
+    # 帰りがけ順で後のページから、転置グラフで到達可能な未割当のページを一つの成分とする
+    component = [-1] * n
+    componentCount = 0
+    
+    for root in reversed(finishOrder):
+        if component[root] != -1:
+            continue
+        
+        component[root] = componentCount
+        stack = [root]
+        
+        while stack:
+            location = stack.pop()
+            
+            for destination in transposeIndices[transposeIndptr[location]:transposeIndptr[location+1]]:
+                if component[destination] == -1:
+                    component[destination] = componentCount
+                    stack.append(destination)
+        
+        componentCount += 1
+    
+    return (component, componentCount)
+
+
+# 各ページが属する強連結成分の番号のリストと、成分の個数を返す（Tarjan のアルゴリズム）
+# 再帰の代わりに、各ページについて次に辿るリンクの位置を position に記録する
+# maxComponents 個の成分が確定した時点で打ち切る（残りのページの番号は -1 のまま）
+def searchSCCsCSR(indptr: list[int], indices: list[int], maxComponents: int = None) -> tuple[list[int], int]:
+    n = len(indptr) - 1
+    index = [-1] * n       # ページを訪れた順番（未訪問なら -1）
+    lowlink = [0] * n      # そのページから到達可能な、sccStack 上のページの index の最小値
+    onStack = bytearray(n)
+    position = indptr[:-1]
+    component = [-1] * n
+    sccStack = []          # 強連結成分が確定していないページ
+    counter = 0
+    componentCount = 0
+    
+    for root in range(n):
+        if index[root] != -1:
+            continue
+        
+        index[root] = lowlink[root] = counter
+        counter += 1
+        sccStack.append(root)
+        onStack[root] = 1
+        stack = [root]
+        
+        while stack:
+            location = stack[-1]
+            
+            # 辿っていないリンクが残っている場合
+            if position[location] < indptr[location+1]:
+                destination = indices[position[location]]
+                position[location] += 1
+                
+                # 未訪問のリンク先があればそちらを先に辿る
+                if index[destination] == -1:
+                    index[destination] = lowlink[destination] = counter
+                    counter += 1
+                    sccStack.append(destination)
+                    onStack[destination] = 1
+                    stack.append(destination)
+                # リンク先が成分の確定していないページであれば lowlink を更新する
+                elif onStack[destination] and index[destination] < lowlink[location]:
+                    lowlink[location] = index[destination]
+            # リンクを全て辿り終えた場合
+            else:
+                stack.pop()
+                
+                # 戻った先のページに lowlink を伝える
+                if stack and lowlink[location] < lowlink[stack[-1]]:
+                    lowlink[stack[-1]] = lowlink[location]
+                
+                # 自身が強連結成分の根であれば、sccStack から自身までを取り出して成分とする
+                if lowlink[location] == index[location]:
+                    while True:
+                        page = sccStack.pop()
+                        onStack[page] = 0
+                        component[page] = componentCount
+                        
+                        if page == location:
+                            break
+                    
+                    componentCount += 1
+                    
+                    if componentCount == maxComponents:
+                        return (component, componentCount)
+    
+    return (component, componentCount)
+
+
+# 閉路のないハイパーテキストの推移簡約で削除されるリンクを (始点, 終点) の番号の組のリストとして返す
+# order は全てのページの番号を、リンク先がリンク元より先に現れるように並べたもの（トポロジカル順の逆順）
+# 到達可能なページの集合を整数のビット列で表すので、子孫の集合の和は一度の OR で求まる（Aho–Garey–Ullman）
+def searchRedundantLinksCSR(indptr: list[int], indices: list[int], order: list[int]) -> list[tuple[int, int]]:
+    reachable = [0] * (len(indptr) - 1)  # 各ページから長さ1以上の経路で到達可能なページ
+    redundant = []
+    
+    for location in order:
+        children = 0
+        indirect = 0  # リンク先を経由して（長さ2以上の経路で）到達可能なページ
+        
+        for destination in indices[indptr[location]:indptr[location+1]]:
+            children |= 1 << destination
+            indirect |= reachable[destination]
+        
+        # 別のリンク先を経由して到達できるリンク先へのリンクは冗長
+        for destination in indices[indptr[location]:indptr[location+1]]:
+            if indirect >> destination & 1:
+                redundant.append((location, destination))
+        
+        reachable[location] = children | indirect
+    
+    return redundant
 
 
 # Webページに相当する
 class Page:
     def __init__(self, id: int, destinationIds: set[int]):
         self.id: int = id
-        self.destinationIds: set[int] = destinationIds
+        # リンク先の集合はページが専有する（他のページやハイパーテキストと共有すると変更を検知できない）
+        self.destinationIds: set[int] = set(destinationIds)
+        
+        # ページを保持しているサーバ（リンクの変更を知らせ、キャッシュを無効化させる）
+        # 弱参照で保持するので、ページから参照されているだけのサーバは解放される
+        self.servers: weakref.WeakSet["Server"] = weakref.WeakSet()
+        
+        # ランダムな選択に用いるリンク先のタプル（リンクが変更されるまで使い回す）
+        self._destTuple: Union[tuple[int, ...], None] = None
+    
+    # リンク先をタプルとして返す
+    def getDestinationTuple(self) -> tuple[int, ...]:
+        if self._destTuple is None:
+            self._destTuple = tuple(self.destinationIds)
+        
+        return self._destTuple
+    
+    # リンク先をランダムに一つ返す（リンクがなければ None を返す）
+    def getRandomDestinationId(self) -> Union[int, None]:
+        return random.choice(choices) if (choices := self.getDestinationTuple()) else None
     
     # ページにハイパーリンクを追加する
     def addLink(self, *destinationIds: int):
-        self.destinationIds.update(set(destinationIds))
+        # リンク先が与えられなければ何もしない（キャッシュも無効化しない）
+        if not destinationIds:
+            return
+        elif len(destinationIds) == 1:
+            self.destinationIds.add(destinationIds[0])
+        else:
+            self.destinationIds.update(destinationIds)
+        
+        self._destTuple = None
+        
+        for server in self.servers:
+            server._addReverseLinks(self.id, destinationIds)
     
     # ページから指定したハイパーリンクを削除する
     def deleteLink(self, *destinationIds: int):
-        for id in destinationIds:
-            self.destinationIds.discard(id)
+        if not destinationIds:
+            return
+        
+        self.destinationIds.difference_update(destinationIds)
+        self._destTuple = None
+        
+        for server in self.servers:
+            server._deleteReverseLinks(self.id, destinationIds)
 
 
 # サーバに相当する
 # ページを id を鍵とした辞書の形で保持し、それらを元にハイパーテキストを構築する
 class Server:
+    # 距離の一覧を保持しておく始点の個数
+    distanceCacheSize: int = 64
+    
     def __init__(self, pages: set[Type[Page]] = None):
         if pages is None:
             pages = set()
         
         # ページIDとページを対応付ける
         self.record: dict[int, Type[Page]] = {page.id: page for page in pages}
+        
+        for page in self.record.values():
+            page.servers.add(self)
+        
+        # ハイパーテキストが変更されるたびに増える版番号と、計算結果をその時の版番号とともに記録するキャッシュ
+        self._version: int = 0
+        self._cache: dict[tuple, tuple[int, any]] = dict()
+        
+        # 始点ごとの各ページまでの距離（最近使われた distanceCacheSize 個の始点の分を、記録した版番号とともに保持する）
+        self._distanceCache: OrderedDict[int, list[int]] = OrderedDict()
+        self._distanceCacheVersion: int = 0
+        
+        # 探索で周回済のページに付ける印と、その世代番号（世代を進めるだけで全ての印が無効になる）
+        self._marks: array = array("i")
+        self._generation: int = 0
+        
+        # 逆リンクの索引（ページIDとそのページにリンクしているページのIDの集合を対応付ける）
+        # 全てのページと、存在しないページのうちリンクされているものを鍵に持ち、リンクの変更に合わせて更新される
+        self._reverse: dict[int, set[int]] = {pageId: set() for pageId in self.record}
+        
+        for (startId, page) in self.record.items():
+            for endId in page.destinationIds:
+                self._reverse.setdefault(endId, set()).add(startId)
+    
+    # ——— キャッシュ ———
+    
+    # ハイパーテキストの変更を記録し、それ以前の計算結果を無効にする
+    def _invalidate(self):
+        self._version += 1
+        
+        # ページごとの計算結果（鍵が (名前, ページID) のもの）は、同じページについて再び求められるまで上書きされず
+        # 古い版のまま溜まり続けるので、ここで捨てる
+        for key in [key for key in self._cache if len(key) > 1]:
+            del self._cache[key]
+    
+    # 現在の版に対する計算結果があればそれを、なければ計算して記録したものを返す
+    def _cached(self, key: tuple, compute) -> any:
+        if (entry := self._cache.get(key)) is None or entry[0] != self._version:
+            entry = self._cache[key] = (self._version, compute())
+        
+        return entry[1]
+    
+    # 現在の版に対する計算結果があればそれを、なければ計算せずに None を返す
+    def _peekCached(self, key: tuple) -> any:
+        if (entry := self._cache.get(key)) is None or entry[0] != self._version:
+            return None
+        
+        return entry[1]
+    
+    # ——— 逆リンクの索引 ———
+    
+    # 追加されたリンクを逆リンクの索引に反映する
+    def _addReverseLinks(self, startId: int, endIds: tuple[int, ...]):
+        for endId in endIds:
+            self._reverse.setdefault(endId, set()).add(startId)
+        
+        self._invalidate()
+    
+    # 削除されたリンクを逆リンクの索引に反映する
+    def _deleteReverseLinks(self, startId: int, endIds: tuple[int, ...]):
+        for endId in endIds:
+            if (startIds := self._reverse.get(endId)) is not None:
+                startIds.discard(startId)
+                
+                # 存在しないページはリンクされなくなったら索引から外す
+                if not startIds and endId not in self.record:
+                    del self._reverse[endId]
+        
+        self._invalidate()
+    
+    # ハイパーテキストの CSR 表現を (番号からページID, ページIDから番号, indptr, indices) の組として返す
+    # 存在しないページへのリンク先にも番号を振る
+    # 各ページのリンク先は番号順に並べる（探索が配列の前から順に進み、結果も集合の反復順によらなくなる）
+    def _getCSR(self) -> tuple[list[int], dict[int, int], array, array]:
+        def build() -> tuple[list[int], dict[int, int], array, array]:
+            pageIds = list(self.record)
+            indexOf = {pageId: i for (i, pageId) in enumerate(pageIds)}
+            
+            for page in self.record.values():
+                for destinationId in page.destinationIds:
+                    if destinationId not in indexOf:
+                        indexOf[destinationId] = len(pageIds)
+                        pageIds.append(destinationId)
+            
+            indptr = array("i", [0])
+            indices = array("i")
+            
+            for pageId in pageIds:
+                if (page := self.record.get(pageId)) is not None:
+                    indices.extend(sorted(indexOf[destinationId] for destinationId in page.destinationIds))
+                
+                indptr.append(len(indices))
+            
+            return (pageIds, indexOf, indptr, indices)
+        
+        return self._cached(("CSR",), build)
+    
+    # CSR 表現の転置を (indptr, indices) の組として返す（番号は _getCSR と共通）
+    def _getTransposeCSR(self) -> tuple[array, array]:
+        return self._cached(("transposeCSR",), lambda: transposeCSR(*self._getCSR()[2:]))
+    
+    # 強連結成分の番号のリストから、成分ごとのページIDの集合を作る
+    def _groupByComponent(self, component: list[int], componentCount: int) -> frozenset[frozenset[int]]:
+        pageIds = self._getCSR()[0]
+        components: list[list[int]] = [[] for _ in range(componentCount)]
+        
+        for (pageId, c) in zip(pageIds, component):
+            components[c].append(pageId)
+        
+        return frozenset(frozenset(pageIds) for pageIds in components)
+    
+    # CSR 表現の各ページが属する強連結成分の番号のリストと、成分の個数を返す（Tarjan のアルゴリズム）
+    def _getSCCLabels(self) -> tuple[list[int], int]:
+        return self._cached(("SCCLabels",), lambda: searchSCCsCSR(*self._getCSR()[2:]))
+    
+    # CSR 表現の各ページのリンク先を、番号のビット列（整数）として返す
+    def _getAdjacencyBits(self) -> list[int]:
+        def build() -> list[int]:
+            pageIds, indexOf, indptr, indices = self._getCSR()
+            rows = []
+            
+            # ページごとにビットマップを作り、一度に整数へ変換する
+            for i in range(len(pageIds)):
+                bitmap = bytearray((len(pageIds) + 7) // 8)
+                
+                for j in indices[indptr[i]:indptr[i+1]]:
+                    bitmap[j >> 3] |= 1 << (j & 7)
+                
+                rows.append(int.from_bytes(bitmap, "little"))
+            
+            return rows
+        
+        return self._cached(("adjacencyBits",), build)
+    
+    # 始点から各ページ（CSR 表現の番号）までの距離のリストを返す
+    # 最近使われた始点の結果から順に distanceCacheSize 個まで、ハイパーテキストが変更されるまで保持する
+    def _getDistancesFrom(self, startPageId: int) -> list[int]:
+        if self._distanceCacheVersion != self._version:
+            self._distanceCache.clear()
+            self._distanceCacheVersion = self._version
+        
+        if (distances := self._distanceCache.get(startPageId)) is not None:
+            self._distanceCache.move_to_end(startPageId)
+            return distances
+        
+        pageIds, indexOf, indptr, indices = self._getCSR()
+        
+        # 平均の出次数がページ数の 1/64 以上の密なハイパーテキストではビット列で探索する
+        if len(indices) * 64 >= len(pageIds) ** 2:
+            distances = searchDistancesBitset(self._getAdjacencyBits(), indexOf[startPageId])
+        else:
+            distances = searchDistancesCSR(indptr, indices, indexOf[startPageId])
+        
+        self._distanceCache[startPageId] = distances
+        
+        # 最も長く使われていない始点の結果を捨てる
+        if len(self._distanceCache) > self.distanceCacheSize:
+            self._distanceCache.popitem(last=False)
+        
+        return distances
+    
+    # 周回済の印の配列と、新しい世代番号を返す
+    # 探索のたびに配列を確保し直したり 0 で埋め直したりする必要がない
+    def _nextGeneration(self) -> tuple[array, int]:
+        n = len(self._getCSR()[0])
+        
+        # ページが増えた場合と、世代番号が上限に達した場合のみ配列を作り直す
+        if len(self._marks) < n or self._generation == 2**31 - 1:
+            self._marks = array("i", [0]) * n
+            self._generation = 0
+        
+        self._generation += 1
+        
+        return (self._marks, self._generation)
     
     # ——— record に対する操作 ———
     
@@ -93,131 +596,109 @@ class Server:
     
     # ページをサーバに追加する
     def addPage(self, *pages: Type[Page]):
-        self.record.update({(page.id, page) for page in pages})
+        for page in pages:
+            # 同じ id の別のページを置き換える場合、元のページのリンクを索引から外す
+            if (oldPage := self.record.get(page.id)) is not None and oldPage is not page:
+                oldPage.servers.discard(self)
+                self._deleteReverseLinks(oldPage.id, oldPage.destinationIds)
+            
+            self.record[page.id] = page
+            page.servers.add(self)
+            
+            self._reverse.setdefault(page.id, set())
+            self._addReverseLinks(page.id, page.destinationIds)
+        
+        self._invalidate()
     
     # 指定したページをサーバから削除する（他のページからのリンクも削除する）
     def deletePage(self, *ids: int):
         # 出次数を0にする
         for id in ids:
-            self.record.pop(id, None)
+            if (page := self.record.pop(id, None)) is not None:
+                page.servers.discard(self)
+                self._deleteReverseLinks(id, page.destinationIds)
         
-        # 入次数を0にする（他のページからのリンクを削除する）
+        self._invalidate()
+        
+        # 入次数を0にする（逆リンクの索引から、リンクしているページのみを辿って削除する）
         for id in ids:
-            for page in self.record.values():
-                page.deleteLink(id)
+            for startId in list(self._reverse.get(id, ())):
+                self.record[startId].deleteLink(id)
+            
+            self._reverse.pop(id, None)
     
     # ——— ハイパーテキストの生成 ———
     
+    # 値はページのリンク先の集合そのものなので、変更する場合は Page.addLink / deleteLink を用いる
+    # 辞書はハイパーテキストが変更されるまで使い回すので、呼び出し側で変更してはならない
     def getHypertext(self):
-        return {pageId: page.destinationIds for (pageId, page) in self.record.items()}
+        return self._cached(("hypertext",),
+                            lambda: {pageId: page.destinationIds for (pageId, page) in self.record.items()})
+    
+    # ハイパーテキストの (ページID, リンク先) の組をページID順に返すイテレータ
+    # 並べ替えた結果はハイパーテキストが変更されるまで使い回す
+    # 並べ替えるのはページID（整数）のみで、組の比較や鍵関数の呼び出しを伴わない
+    def iterSortedHypertext(self):
+        return iter(self._cached(("sortedHypertext",),
+                                 lambda: [(pageId, self.record[pageId].destinationIds) for pageId in sorted(self.record)]))
     
     # ハイパーテキストの構造をソートして返す
     def getSortedHypertext(self) -> dict[int, set[int]]:
-        return dict(sorted(self.getHypertext().items(), key=(lambda x: x[0])))
+        return dict(self.iterSortedHypertext())
     
     # 与えられたハイパーテキストの全てのリンクを反転させた転置グラフを生成する
+    # 逆リンクの索引そのものを返すので、呼び出し側で変更してはならない
     def getTransposeHypertext(self) -> dict[int, set[int]]:
-        # 転置したリンクを取得する
-        hyperlinks = self.getHyperlinks()
-        pageIdsWithoutInEdge = {hyperlink[0] for hyperlink in hyperlinks} - {hyperlink[1] for hyperlink in hyperlinks}
-        transposeHyperlinks = {hyperlink[::-1] for hyperlink in hyperlinks}
-        
-        # リンクからハイパーテキストを構築する
-        transposeHypertext: dict[int, set[int]] = dict()
-        
-        for hyperlink in transposeHyperlinks:
-            if hyperlink[0] in transposeHypertext:
-                transposeHypertext[hyperlink[0]].add(hyperlink[1])
-            else:
-                transposeHypertext[hyperlink[0]] = {hyperlink[1]}
-        
-        transposeHypertext |= {pageId: set() for pageId in pageIdsWithoutInEdge}
-        
-        for isolated in self.getPageIds() - transposeHypertext.keys():
-            transposeHypertext[isolated] = set()
-        
-        return transposeHypertext
+        return self._reverse
     
     # ハイパーテキストを構築する
-    def getInducedSubgraph(self, originId: int = None, constructed: dict[int, set[int]] = None) -> dict[int, set[int]]:
-        def constructHypertextUniteratively(originId: int, constructed: dict[int, set[int]] = None) -> dict[int, set[int]]:
-            if constructed is None:
-                constructed = dict()
-            
-            # ページが周回済みだった場合
-            if originId in constructed:
-                return
-            
-            # ハイパーリンクを保存する
-            location = self.getPage(originId)
-            constructed[originId] = copy.copy(location.destinationIds)
-            
-            # リンク先の各ページを起点にハイパーテキストを構築する
-            for i in location.destinationIds:
-                descendantHypertext = constructHypertextUniteratively(i, constructed)
-                if descendantHypertext is not None:
-                    constructed |= descendantHypertext
-            
-            return constructed
-    
-        # 始点が指定されていない場合、全てのページから走査する
-        if originId is None:
-            leftPages = self.getPageIds()
-            constructed = dict()
-            while leftPages:
-                constructed |= constructHypertextUniteratively(getMember(leftPages), constructed)
-                leftPages -= constructed.keys()
-        # 始点が指定されている場合、そのページから辿り着ける範囲のみ走査する
-        else:
-            constructed = constructHypertextUniteratively(originId)
-            
-        return constructed
+    # 再帰による実装は深いハイパーテキストで RecursionError を起こすため、非再帰版に委ねる
+    def getInducedSubgraph(self, originId: int = None) -> dict[int, frozenset[int]]:
+        return self.getInducedSubgraph_nonrec(originId)
     
     # ハイパーテキストを構築する（非再帰）
-    def getInducedSubgraph_nonrec(self, originId: int = None):
-        if originId is None:
-            stack = [getMember(self.getPageIds())]
-            leftPageIds = self.getPageIds()
-        else:
-            stack = [originId]
-            leftPageIds = dict()
+    # リンク先は構築時点の frozenset として記録する（ページ側の変更の影響を受けず、変更もできない）
+    # 存在しないページはリンク先には残るが、鍵には含めない
+    def getInducedSubgraph_nonrec(self, originId: int = None) -> dict[int, frozenset[int]]:
+        # 始点が指定されている場合、CSR 表現上でそのページから辿り着けるページを求める
+        if originId is not None:
+            pageIds, indexOf, indptr, indices = self._getCSR()
+            marks, mark = self._nextGeneration()
+            reachableIds = {originId} | {pageIds[i] for i in searchDescendantsCSR(indptr, indices, indexOf[originId], marks, mark)}
             
-        hypertext: dict[int, set[int]] = dict()
+            return {pageId: frozenset(page.destinationIds)
+                    for pageId in reachableIds if (page := self.record.get(pageId)) is not None}
         
-        # 発見されたが未訪問のページが存在する限り
-        while stack:
-            locationId = stack.pop()
+        # 始点が指定されていない場合、全てのページが含まれるので、辿らずに record を一度だけ走査する
+        return {pageId: frozenset(page.destinationIds) for (pageId, page) in self.record.items()}
+    
+    # 強連結成分を、成分内の最小のページIDを代表として1ページに縮約したハイパーテキストを返す
+    # Tarjan のアルゴリズムによる成分の番号を使い回し、CSR 表現のリンクを一度走査するだけで求める
+    def SCCContracted(self):
+        def build() -> dict[int, set[int]]:
+            pageIds, indexOf, indptr, indices = self._getCSR()
+            component, componentCount = self._getSCCLabels()
             
-            # ページが未周回なら
-            if locationId not in hypertext:
-                destinationIds = self.getPage(locationId).destinationIds
-                
-                hypertext[locationId] = copy.copy(destinationIds)
+            # 成分の番号から代表のページIDへの対応
+            representatives: list[int] = [None] * componentCount
+            
+            for (pageId, c) in zip(pageIds, component):
+                if representatives[c] is None or pageId < representatives[c]:
+                    representatives[c] = pageId
+            
+            contraction = {r: set() for r in representatives}
+            
+            for i in range(len(pageIds)):
+                c = component[i]
+                destinations = contraction[representatives[c]]
                 
-                for destinationId in destinationIds:
-                    if destinationId not in hypertext:
-                        stack.append(destinationId)
+                for j in indices[indptr[i]:indptr[i+1]]:
+                    if component[j] != c:
+                        destinations.add(representatives[component[j]])
             
-            if originId is None:
-                leftPageIds -= hypertext.keys()
-                if leftPageIds and not stack:
-                    stack = [getMember(leftPageIds)]
-        
-        return hypertext
-    
-    def SCCContracted(self):
-        sccs = self.getSCCs()
-        rToIds = {min(scc): set(scc) for scc in sccs}
-        idToR = {id: r for r, ids in rToIds.items() for id in ids}
-        contraction = {key: set() for key in rToIds.keys()}
-        
-        for r, scc in rToIds.items():
-            for pageId in scc:
-                for destinationId in self.getPage(pageId).destinationIds:
-                    if destinationId not in scc:
-                        contraction[r] |= {idToR[destinationId]}
+            return contraction
         
-        return contraction
+        return {r: set(destinations) for (r, destinations) in self._cached(("SCCContraction",), build).items()}
     
     # 推移簡約
     def transitiveReduction(self):
@@ -225,68 +706,107 @@ class Server:
         getdescendants と同様に巡回するが、二度目に訪れた時にそのページを記録し、元ページからそのページへのリンクを削除する
 
         各頂点の各リンクについて、そのリンクを通らずにリンク先に到達可能な場合、そのリンクを削除していく
+
+        閉路がなければ推移簡約は一意に定まるので、強連結成分分解の結果から得たトポロジカル順に沿って CSR 表現上で求める
         """
-        tmpServer = copy.deepcopy(self)
-        deletion = set()
-        
-        for startId in tmpServer.getPageIds():
-            children = copy.copy(tmpServer.getPage(startId).destinationIds)
+        def search() -> set[tuple[int, int]]:
+            pageIds, indexOf, indptr, indices = self._getCSR()
+            component, componentCount = self._getSCCLabels()
             
-            if len(children) < 2:
-                continue
+            # 全ての強連結成分が1ページからなり、自己ループもなければ閉路はない
+            # Tarjan のアルゴリズムは成分をトポロジカル順の逆順に番号付けるので、番号をそのまま処理の順番とする
+            isAcyclic = (componentCount == len(component)
+                         and not any(i in indices[indptr[i]:indptr[i+1]] for i in range(len(component))))
+            
+            if isAcyclic:
+                order = [0] * len(component)
+                
+                for (i, c) in enumerate(component):
+                    order[c] = i
+                
+                return {(pageIds[start], pageIds[end]) for (start, end) in searchRedundantLinksCSR(indptr, indices, order)}
+            
+            # 閉路がある場合は、各リンクについて、そのリンクを通らずにリンク先に到達できれば削除していく
+            # サーバ全体を複製する代わりに、作業用にリンク先の集合のみを複製する
+            links = {pageId: set(page.destinationIds) for (pageId, page) in self.record.items()}
+            deletion = set()
             
-            for endId in children:
-                visited = {startId}
-                stack = [child for child in children - {endId}]
+            for (startId, children) in links.items():
+                if len(children) < 2:
+                    continue
                 
-                while stack:
-                    locationId = stack.pop()
-                    escapeFlag = False
+                for endId in list(children):
+                    # endId 以外のリンク先から、始点を通らずに endId に到達できるかを調べる
+                    visited = {startId}
+                    stack = list(children - {endId})
                     
-                    # ページが未周回なら
-                    if locationId not in visited:
-                        visited.add(locationId)
+                    while stack:
+                        locationId = stack.pop()
                         
-                        for destinationId in tmpServer.getPage(locationId).destinationIds:
-                            if destinationId == endId:
-                                deletion.add((startId, endId))
-                                tmpServer.getPage(startId).deleteLink(endId)
-                                
-                                escapeFlag = True
-                                break
-                            elif destinationId not in visited:
-                                stack.append(destinationId)
-                    
-                    if escapeFlag:
-                        break
-        return deletion
+                        if locationId == endId:
+                            deletion.add((startId, endId))
+                            children.discard(endId)
+                            break
+                        elif locationId not in visited:
+                            visited.add(locationId)
+                            stack.extend(links.get(locationId, ()))
+            
+            return deletion
+        
+        return set(self._cached(("transitiveReduction",), search))
     
     # ——— ハイパーテキストの情報取得 ———
     
     def getPageIds(self):
         return self.record.keys()
     
+    # ページIDをランダムに一つ返す（ページがなければ None を返す）
+    # 選択に用いるページIDのタプルはハイパーテキストが変更されるまで使い回す
+    def getRandomPageId(self) -> Union[int, None]:
+        return random.choice(pageIds) if (pageIds := self._cached(("pageIdTuple",), lambda: tuple(self.record))) else None
+    
+    # ハイパーリンク（(リンク元, リンク先) の組）を一つずつ返すイテレータ（集合を作らない）
+    def iterHyperlinks(self):
+        return ((startId, endId) for (startId, page) in self.record.items() for endId in page.destinationIds)
+    
     # 与えられたハイパーテキストからハイパーリンクを得る
+    # 結果はハイパーテキストが変更されるまでキャッシュされるので、複製して返す
     def getHyperlinks(self) -> set[tuple[int, int]]:
-        hypertext = self.getHypertext()
-        
-        s = set()
-        
-        # ハイパーリンクをタプルに変換する
-        for (startId, endIds) in hypertext.items():
-            s.update({(startId, endId) for endId in endIds})
-        
-        return s
+        return set(self._cached(("hyperlinks",), lambda: frozenset(self.iterHyperlinks())))
     
     # ハイパーテキスト内の全リンクをソートして返す
-    def getSortedHyperlinks(self) -> set[tuple[int, int]]:
-        return sorted(list(self.getHyperlinks()))
+    # ページIDとページごとのリンク先をそれぞれ並べ替えて連結するので、組どうしの比較を行わない
+    def getSortedHyperlinks(self) -> list[tuple[int, int]]:
+        return list(self._cached(("sortedHyperlinks",),
+                                 lambda: tuple((startId, endId)
+                                               for startId in sorted(self.record)
+                                               for endId in sorted(self.record[startId].destinationIds))))
+    
+    # (リンクを持つページ, リンクされているページ, 存在しないリンク先) を record の一度の走査で求める
+    # ハイパーテキストが変更されるまで使い回すので、以下の3つのメソッドを続けて呼んでも走査は一度で済む
+    def _getEdgeSummary(self) -> tuple[frozenset[int], frozenset[int], frozenset[int]]:
+        def build():
+            startIds: set[int] = set()
+            endIds: set[int] = set()
+            
+            for (pageId, page) in self.record.items():
+                if destinationIds := page.destinationIds:
+                    startIds.add(pageId)
+                    endIds |= destinationIds
+            
+            return (frozenset(startIds), frozenset(endIds), frozenset(endIds - self.record.keys()))
+        
+        return self._cached(("edgeSummary",), build)
     
     def getStartPageIds(self):
-        return {pageId for (pageId, destinationIds) in self.getHypertext().items() if destinationIds}
+        return set(self._getEdgeSummary()[0])
     
     def getEndPageIds(self):
-        return {pageId for (pageId, destinationIds) in self.getTransposeHypertext().items() if destinationIds}
+        return set(self._getEdgeSummary()[1])
+    
+    # 指定したページにリンクしているページの数（入次数）を返す（逆リンクの索引を引くので O(1)）
+    def getInDegree(self, pageId: int) -> int:
+        return len(self._reverse.get(pageId, ()))
     
     def getSourcePageIds(self):
         return self.getPageIds() - self.getEndPageIds()
@@ -297,334 +817,260 @@ class Server:
     def getIsolatedPageIds(self):
         return self.getSourcePageIds() & self.getSinkPageIds()
     
-    # 指定したページから到達可能なページのリストを取得する
-    def getDescendantPageIds(self, originId: int) -> set[int]:
-        descendants = set()
-        stack = [originId]
-        isFirst = True
-        
-        while stack:
-            locationId = stack.pop()
+    # 全てのページに到達可能なページ（根）を一つ返す（存在しなければ None を返す）
+    # 強連結成分を縮約したグラフで入次数が0の成分がただ一つのとき、その成分のページが根となる
+    def getRootPageId(self) -> Union[int, None]:
+        def search() -> Union[int, None]:
+            pageIds, indexOf, indptr, indices = self._getCSR()
+            component, componentCount = self._getSCCLabels()
             
-            # ページが未周回なら
-            if locationId not in descendants:
-                if isFirst:
-                    isFirst = False
-                else:
-                    descendants.add(locationId)
-                
-                destinationIds = self.getPage(locationId).destinationIds
+            # 他の成分からリンクされている成分に印を付ける（成分の番号で引くバイト列を用いる）
+            hasInEdge = bytearray(componentCount)
+            
+            for location in range(len(pageIds)):
+                c = component[location]
                 
-                for destination in destinationIds:
-                    if destination not in descendants:
-                        stack.append(destination)
+                for destination in indices[indptr[location]:indptr[location+1]]:
+                    if component[destination] != c:
+                        hasInEdge[component[destination]] = 1
+            
+            if hasInEdge.count(0) == 1:
+                return pageIds[component.index(hasInEdge.index(0))]
+            else:
+                return None
+        
+        return self._cached(("rootPageId",), search)
+    
+    # 指定したページから到達可能なページの集合を、キャッシュしたまま（複製せずに）返す
+    def _getDescendants(self, originId: int) -> frozenset[int]:
+        def search() -> frozenset[int]:
+            pageIds, indexOf, indptr, indices = self._getCSR()
+            marks, mark = self._nextGeneration()
+            
+            return frozenset(pageIds[i] for i in searchDescendantsCSR(indptr, indices, indexOf[originId], marks, mark))
+        
+        return self._cached(("descendants", originId), search)
+    
+    # 指定したページから到達可能なページのリストを取得する
+    def getDescendantPageIds(self, originId: int) -> set[int]:
+        # キャッシュを呼び出し側の変更から守るため、複製して返す
+        return set(self._getDescendants(originId))
+    
+    # 指定したページから到達可能なページのIDをランダムに一つ返す（なければ None を返す）
+    # 選択に用いるタプルは始点ごとにハイパーテキストが変更されるまで使い回し、集合の複製も作らない
+    def getRandomDescendantPageId(self, originId: int) -> Union[int, None]:
+        descendantIds = self._cached(("descendantTuple", originId), lambda: tuple(self._getDescendants(originId)))
         
-        return descendants
+        return random.choice(descendantIds) if descendantIds else None
+    
+    # 複数のページについて、それぞれから到達可能なページの集合をまとめて取得する
+    # CSR 表現は一度だけ構築され、結果はページごとにキャッシュされる
+    def getDescendantPageIds_batch(self, originIds: list[int]) -> dict[int, set[int]]:
+        return {originId: self.getDescendantPageIds(originId) for originId in originIds}
     
     # 始点と終点を指定し、その2ページ間の距離（到達に必要な最短のリンク数）を取得する
     def getDistance(self, startPageId: int, endPageId: int, printsDetails: bool = False):
-        # 始点と終点の実在性を確認
-        allPagesLinked = self.getPageIds()
-        if not (startPageId in allPagesLinked and endPageId in allPagesLinked):
+        # 始点と終点の実在性を確認（record を直接引くので O(1)）
+        if not (startPageId in self.record and endPageId in self.record):
             return None
         
         # 始点と終点が同一の場合
         if startPageId == endPageId:
             return 0
         
-        # 幅優先探索
-        q = queue.Queue()
-        q.put(startPageId)
+        # 経過を表示しない場合は、始点からの距離の一覧（同じ始点なら使い回される）を引く
+        if not printsDetails:
+            distance = self._getDistancesFrom(startPageId)[self._getCSR()[1][endPageId]]
+            
+            return None if distance == -1 else distance
+        
+        # 幅優先探索（ここに来るのは経過を表示する場合のみ）
+        # 始点からの距離が同じページ（frontier）をまとめて処理する
+        frontier = [startPageId]
         visited = {startPageId}
         depth = 0
-        same = 1
-        next = 0
         
-        while q.queue:
-            if same == 0:
-                same = next
-                next = 0
-                depth += 1
+        while frontier:
+            print(depth, frontier)
             
-            if printsDetails:
-                print(depth, q.queue)
-                print(" Left pages on the same level:", same)
-                print(" pages on the next level     :", next)
+            depth += 1
+            nextFrontier = []
             
-            locationId = q.get()
-            
-            for destinationId in self.getHypertext().get(locationId):
-                if destinationId == endPageId:
-                    return depth + 1
-                else:
-                    if destinationId not in visited:
+            # ハイパーテキストを構築せず、各ページのリンク先を record から直接引く
+            for locationId in frontier:
+                for destinationId in (page.destinationIds if (page := self.record.get(locationId)) is not None else ()):
+                    if destinationId == endPageId:
+                        return depth
+                    elif destinationId not in visited:
                         visited.add(destinationId)
-                        next += 1
-                        q.put(destinationId)
+                        nextFrontier.append(destinationId)
             
-            same -= 1
+            frontier = nextFrontier
         
         return None
     
+    # 2ページ間の距離を、双方向の幅優先探索で取得する
+    # 始点ごとの距離の一覧を作らないので、様々な始点について一度ずつ問い合わせる場合に向く
+    def getDistance_bidir(self, startPageId: int, endPageId: int):
+        if not (startPageId in self.record and endPageId in self.record):
+            return None
+        
+        pageIds, indexOf, indptr, indices = self._getCSR()
+        distance = searchDistanceBidirectionalCSR(indptr, indices, *self._getTransposeCSR(),
+                                                  indexOf[startPageId], indexOf[endPageId])
+        
+        return None if distance == -1 else distance
+    
+    # 複数の始点と終点の組について距離をまとめて求める（result[i][j] が sources[i] から sinks[j] への距離）
+    # CSR 表現と終点の添字は一度だけ引き、始点ごとに一回ずつ幅優先探索する
+    def getDistances_batch(self, sourcePageIds: list[int], sinkPageIds: list[int]) -> list[list[Union[int, None]]]:
+        indexOf = self._getCSR()[1]
+        sinkIndices = [indexOf[sinkPageId] if sinkPageId in self.record else None for sinkPageId in sinkPageIds]
+        
+        result = []
+        
+        for sourcePageId in sourcePageIds:
+            if sourcePageId not in self.record:
+                result.append([None] * len(sinkIndices))
+                continue
+            
+            distances = self._getDistancesFrom(sourcePageId)
+            result.append([None if index is None or distances[index] == -1 else distances[index] for index in sinkIndices])
+        
+        return result
+    
     # ハイパーテキストを強連結成分（Strongly Connected Components）分解する
     # 強連結成分：その部分グラフであって、任意の2頂点間に双方向に有向路がある（＝強連結である）もの
     # Kosaraju のアルゴリズムに相当する
     def getSCCs(self, printsDetails: bool = False) -> set[frozenset[int]]:
+        # 経過を表示しない場合は CSR 表現とその転置の上で求める
+        if not printsDetails:
+            pageIds, indexOf, indptr, indices = self._getCSR()
+            
+            return set(self._groupByComponent(*searchSCCsKosarajuCSR(indptr, indices, *self._getTransposeCSR())))
+        
         # ラベリング
         if printsDetails: print("——— Labelling")
         
         hypertext = self.getHypertext()
         
-        # ラベリング関数の定義
+        # 帰りがけ順にラベリングする（finishOrder の添字がラベルとなる）
         # 削除されたページもラベリングされる
-        def label(n: int = 0, pageIdToLabel: dict[int, int] = None,
-                  visitedPageIds: set[int] = set()) -> dict[int, int]:
-            if pageIdToLabel is None:
-                pageIdToLabel = dict()
-            
-            # 片道のラベリング関数の定義
-            # 始点に戻ってきたら終了し、未周回のページを残しうる
-            def label_oneway(locationId: int, n: int = 0) -> int:
-                # 周回済だった場合（処理済であるか、のちに処理されるので無視）
-                if locationId in visitedPageIds:
-                    if printsDetails: print(locationId, "has been visited")
-                    
-                    return n
-                # リンク先がない場合
-                elif not hypertext.get(locationId):
-                    if printsDetails: print(locationId, "is a dead end. No.", n)
-                    
-                    visitedPageIds.add(locationId)  # 周回済にする
-                    pageIdToLabel[locationId] = n   # ラベリングする
-                    n += 1                          # 次のラベルの値をこのページのラベル + 1 にする
-                    return n                        # 次に付けられるべきラベルの値を返す
-                # リンク先がある場合
-                else:
-                    if printsDetails: print(locationId, "has links:")
-                    
-                    visitedPageIds.add(locationId)
-                    # 各リンク先において片道のラベリングを行う
-                    for destinationId in hypertext.get(locationId):
-                        n = label_oneway(destinationId, n)  # 次のラベルの値を与え、再帰する
-                    
-                    if printsDetails: print(f"Came back to {locationId}. No.", n)
-                    
-                    pageIdToLabel[locationId] = n
-                    n += 1
-                    return n
-            
-            # ラベリングされていないページがあるならば
-            if leftPageIds := hypertext.keys() - visitedPageIds:
-                startPageId = getMember(leftPageIds)
-                
-                if printsDetails: print("Start labelling from", startPageId,
-                                        "with", pageIdToLabel)
-                
-                # 適当なページから片道のラベリングを行う
-                n = label_oneway(startPageId, n)
-                
-                # 再帰的にラベリングを続ける
-                return label(n, pageIdToLabel, visitedPageIds)
-            # すべてラベリングされているならば
-            else:
-                return pageIdToLabel
-        
-        # ラベリングの実行
-        pageIdToLabel = label()
-        labelToPageId = {label: pageId for (pageId, label) in pageIdToLabel.items()}
-        
-        if printsDetails: print("Labelling:", pageIdToLabel)
-        
-        # ハイパーテキストの転置グラフ*を取得する
-        transposeHypertext = self.getTransposeHypertext()
-        
-        # 分解
-        if printsDetails: print("——— Decomposing")
-        
-        # 分解関数の定義
-        def getComponents(foundComponents: set[frozenset[int]] = None,
-                          visitedPageIds: set[int] = set()) -> set[frozenset[int]]:
-            if foundComponents is None:
-                foundComponents = set()
-            
-            # 強連結成分を一つ取得する関数の定義
-            # あるページから転置グラフを辿って到達可能な（自身をリンク先としている）ページの集合を返す
-            def getOneComponent(locationId: int) -> frozenset[int]:
-                # 周回済だった場合
-                if locationId in visitedPageIds:
-                    if printsDetails: print(" ", locationId, "is visited.")
-                    
-                    return frozenset()
-                # リンク先がない場合
-                elif not transposeHypertext.get(locationId):
-                    if printsDetails: print(" ", locationId, "has no links.")
-                    
-                    visitedPageIds.add(locationId)  # 周回済にする
-                    return frozenset({locationId})
-                # リンク先がある場合
-                else:
-                    if printsDetails: print(" ", locationId, "has link:")
-                    
-                    visitedPageIds.add(locationId)
-                    
-                    rv = frozenset({locationId})
-                    for destinaionId in transposeHypertext.get(locationId):
-                        rv |= getOneComponent(destinaionId)
-                        
-                        if printsDetails: print(" Component is updated:", rv)
-                    
-                    return rv
-            
-            # 未周回のページがあるならば
-            if transposeHypertext.keys() - visitedPageIds:
-                nonlocal pageIdToLabel
-                nonlocal labelToPageId
-                
-                if printsDetails: print("pageIdWithMaxLabel:", labelToPageId[max(labelToPageId.keys())])
-                
-                # ラベルが最大のページから強連結成分を取得する
-                component = getOneComponent(labelToPageId[max(labelToPageId.keys())])
-                
-                # 分解された成分に割り当てられたラベリングの削除
-                # 最大のラベルを取得しやすくする
-                pageIdToLabel = {pageId: label
-                                 for (pageId, label) in pageIdToLabel.items()
-                                 if pageId not in component}
-                labelToPageId = {label: pageId for (pageId, label) in pageIdToLabel.items()}
-                
-                if printsDetails: print("Component:", component)
-                
-                # 分解された成分を強連結成分の集合に追加する
-                foundComponents.add(component)
-                
-                # 再帰的にラベリングを続ける
-                return getComponents(foundComponents, visitedPageIds)
-            # すべてラベリングされているならば
-            else:
-                if printsDetails: print("Components:", foundComponents)
-                
-                return foundComponents
-        
-        # ラベリングの実行
-        return (connected := getComponents())
-    
-    # 強連結成分分解（非再帰）
-    def getSccs_nonrec(self, printsDetails: bool = False) -> set[frozenset[int]]:
-        # ページをラベリングする
-        hypertext = self.getHypertext()
-        
-        pageIdToLabel: dict[int, int] = dict()
+        finishOrder: list[int] = []
         visitedPageIds: set[int] = set()
-        n = 0
         
-        # ラベリングされていないページがある限り
-        while leftPageIds := hypertext.keys() - visitedPageIds:
-            stack = [getMember(leftPageIds)]
-            if printsDetails: print("Start labelling from", stack[0], "with", pageIdToLabel)
+        for startPageId in hypertext:
+            # すでにラベリングされているなら無視
+            if startPageId in visitedPageIds:
+                continue
+            
+            if printsDetails: print("Start labelling from", startPageId,
+                                    "with", finishOrder)
+            
+            # 適当なページから片道のラベリングを行う
+            # スタックにはページとそのリンク先のイテレータを積み、戻ってきたときに続きから辿れるようにする
+            visitedPageIds.add(startPageId)
+            stack = [(startPageId, iter(Server.getDestinationIds(hypertext, startPageId)))]
             
-            # 適当なページから到達可能な全てのページに対してラベリングを行う
             while stack:
-                locationId = stack.pop()
-                if printsDetails: print(" Stack:", stack, "Now at", locationId)
+                locationId, destinationIds = stack[-1]
                 
-                # すでにラベリングされているなら無視
-                if locationId in pageIdToLabel:
-                    if printsDetails: print("  Already labelled")
-                    
-                    continue
-                
-                # 自身を周回済にする
-                visitedPageIds.add(locationId)
-                
-                # ラベリングされるのは以下の場合
-                # 未付番かつ以下のいずれかにあてはまる
-                # 1. 子がいない
-                # 2. 子が全て以下のいずれかにあてはまる
-                #     1. 周回済（含付番済）である
-                #     2. 親（自身）と同一である
-                needLabelling = (not (destinationIds := Server.getDestinationIds(hypertext, locationId))
-                                 or destinationIds <= visitedPageIds | {locationId}); 
-                if needLabelling:
-                    if printsDetails: print("  Needs labelling")
-                    
-                    pageIdToLabel[locationId] = n  # ラベリングする
-                    n += 1                         # 次に付けられるべきラベルの値を返す
-                # ラベリングするべきでない場合（リンク先を先に処理すべき場合）
+                for destinationId in destinationIds:
+                    # 周回済だった場合（処理済であるか、のちに処理されるので無視）
+                    if destinationId in visitedPageIds:
+                        if printsDetails: print(destinationId, "has been visited")
+                    # 未周回のリンク先があればそちらを先に辿る
+                    else:
+                        if printsDetails: print(locationId, "has a link to", destinationId)
+                        
+                        visitedPageIds.add(destinationId)
+                        stack.append((destinationId, iter(Server.getDestinationIds(hypertext, destinationId))))
+                        break
+                # リンク先を全て辿り終えた場合
                 else:
-                    if printsDetails: print("  Later; links:", hypertext.get(locationId))
+                    if printsDetails: print(f"Came back to {locationId}. No.", len(finishOrder))
                     
-                    visitedPageIds.add(locationId)
-                    stack.append(locationId)
-                    for destinaionId in hypertext.get(locationId):
-                        stack.append(destinaionId)
+                    stack.pop()
+                    finishOrder.append(locationId)  # ラベリングする
         
-        if printsDetails: print("Labelling:", pageIdToLabel)
+        if printsDetails: print("Labelling:", finishOrder)
         
-        labelToPageId = {label: pageId for (pageId, label) in pageIdToLabel.items()}
-        
-        # ハイパーテキストの転置グラフを取得する
+        # ハイパーテキストの転置グラフ*を取得する
         transposeHypertext = self.getTransposeHypertext()
         
         # 分解
         if printsDetails: print("——— Decomposing")
         
-        components: set[frozenset[int]] = set()
-        leftPageIds = set(pageIdToLabel.keys())
+        foundComponents: set[frozenset[int]] = set()
+        assigned: set[int] = set()  # すでにいずれかの成分に含められたページ
         
-        while labelToPageId:
-            if printsDetails: print("Components:", components)
-            if printsDetails: print("Labelling :", labelToPageId)
+        # ラベルが大きい（帰りがけ順で後の）ページから順に成分を取り出す
+        while finishOrder:
+            startPageId = finishOrder.pop()
             
-            PageIdWithMaxLabel = labelToPageId[max(labelToPageId.keys())]
-            stack = [PageIdWithMaxLabel]
-            component = set()
+            if startPageId in assigned:
+                continue
+            
+            if printsDetails: print("pageIdWithMaxLabel:", startPageId)
+            
+            # ラベルが最大のページから転置グラフを辿って到達可能な（自身をリンク先としている）ページの集合を取得する
+            assigned.add(startPageId)
+            component = {startPageId}
+            stack = [startPageId]
             
             while stack:
-                if printsDetails: print(" Stack     :", stack)
-                
                 locationId = stack.pop()
                 
-                # 強連結成分の一部として確定されるのは次のいずれかに当て嵌まったとき：
-                # 1. リンク先が全て、以下のいずれかに該当する：
-                #   1. 今分離しようとしている強連結成分に含まれる
-                #   2. すでに分離された強連結成分に含まれる
-                #   3. 周回済である
-                needsExtracting = ((destinationIds := Server.getDestinationIds(transposeHypertext, locationId))
-                                   <= component
-                                      | (pageIdToLabel.keys() - labelToPageId.values())
-                                      | set(stack));
-                
-                # 逆リンク先がない場合（もとのハイパーテキストでどこからもリンクされていない場合）
-                if needsExtracting:
-                    component.add(locationId)
-                else:
-                    if printsDetails: print("  Links found:", destinationIds)
-                    
-                    component.add(locationId)
-                    for destinationId in destinationIds:
-                        # stack すべきは以下の全てを満たすもの
-                        # 1. すでに別の成分の頂点として分離されていない（labelToPageId.values() に含まれる）
-                        # 2. すでに component に含められていない
-                        # 3. すでに stack に追加されていない
-                        needsStacking = (destinationId in labelToPageId.values()
-                                         and destinationId not in component
-                                         and destinationId not in stack)
-                        
-                        if needsStacking:
-                            stack.append(destinationId)
+                for destinationId in Server.getDestinationIds(transposeHypertext, locationId):
+                    if destinationId not in assigned:
+                        assigned.add(destinationId)
+                        component.add(destinationId)
+                        stack.append(destinationId)
                 
-                if printsDetails: print("  Component-update:", component)
+                if printsDetails: print(" Component is updated:", component)
             
-            components.add(frozenset(component))
-            labelToPageId = {label: pageId
-                             for (label, pageId) in labelToPageId.items()
-                             if pageId not in component}
+            if printsDetails: print("Component:", component)
+            
+            # 分解された成分を強連結成分の集合に追加する
+            foundComponents.add(frozenset(component))
+        
+        if printsDetails: print("Components:", foundComponents)
+        
+        return foundComponents
+    
+    # 強連結成分分解（非再帰）
+    # Tarjan のアルゴリズムによる一度の深さ優先探索で分解する（ラベリングの二度目の走査も転置グラフも必要としない）
+    def getSccs_nonrec(self, printsDetails: bool = False) -> set[frozenset[int]]:
+        components = self.getSCCs_tarjan()
+        
+        if printsDetails: print("Components:", components)
         
         return components
     
+    # 強連結成分分解（Tarjan のアルゴリズム）
+    # 一度の深さ優先探索で分解するため、ラベリングの二度目の走査も転置グラフも必要としない
+    def getSCCs_tarjan(self) -> set[frozenset[int]]:
+        # キャッシュを呼び出し側の変更から守るため、複製して返す
+        return set(self._cached(("SCCs",), lambda: self._groupByComponent(*self._getSCCLabels())))
+    
+    # 強連結成分の個数を返す（成分の集合を作らず、Tarjan のアルゴリズムによる番号付けのみから求める）
+    def countSCCs(self) -> int:
+        return self._getSCCLabels()[1]
+    
     # ハイパーテキストが強連結であるかどうかを返す
+    # 最初に確定した強連結成分が全てのページを含むかどうかだけを調べ、二つ目以降の成分は求めない
     def isStronglyConnected(self) -> bool:
-        return len(self.getSCCs()) == 1
+        # 現在の版について強連結成分の番号が求めてあれば、成分の個数から直ちに答える
+        if (labels := self._peekCached(("SCCLabels",))) is not None:
+            return labels[1] == 1
+        
+        def search() -> bool:
+            pageIds, indexOf, indptr, indices = self._getCSR()
+            component, componentCount = searchSCCsCSR(indptr, indices, maxComponents=1)
+            
+            return componentCount == 1 and -1 not in component
+        
+        return self._cached(("stronglyConnected",), search)
     
     # ハイパーテキスト内のサイクル（closed path）を一つ返す
     def findCycle(self, pageIds: set[int] = None, printsDetails: bool = False) -> Union[list[int], None]:
@@ -649,49 +1095,49 @@ class Server:
         if pageIds is None:
             pageIds = self.getPageIds()
         
-        def f(locationId: int, path: int = None, deadEnds: set[int] = None, printsDetails: bool = False):
-            if path is None:
-                path = []
+        # リンク先（存在しないページはリンクを持たないものとする）
+        def getDestinations(pageId: int):
+            return page.destinationIds if (page := self.record.get(pageId)) is not None else ()
+        
+        # 探索し終えて、そこからはサイクルに至らないことが分かったページ
+        deadEnds: set[int] = set()
+        
+        for originId in pageIds:
+            if originId in deadEnds:
+                continue
             
-            if deadEnds is None:
-                deadEnds = set()
+            # 現在の経路と、経路上のページからその位置への対応（経路上にあるかを O(1) で判定する）
+            # スタックには経路上の各ページのリンク先のイテレータを積み、戻ってきたときに続きから辿れるようにする
+            path = [originId]
+            pathIndexOf = {originId: 0}
+            stack = [iter(getDestinations(originId))]
             
-            # ページが未訪問なら
-            if (index := find(path, locationId)) == -1:
-                if printsDetails: print(locationId, path)
-                
-                if destinationIds := self.getPage(locationId).destinationIds:
-                    for destinationId in destinationIds:
-                        if printsDetails: print(locationId, "to", destinationId, "of", destinationIds)
+            if printsDetails: print(originId, [])
+            
+            while stack:
+                for destinationId in stack[-1]:
+                    # 経路上のページに戻ってきた場合
+                    if destinationId in pathIndexOf:
+                        if printsDetails: print("Cycle found↩︎")
+                        return path[pathIndexOf[destinationId]:] + [destinationId]
+                    # 未探索のページであればそちらを先に辿る
+                    elif destinationId not in deadEnds:
+                        if printsDetails: print(destinationId, path)
                         
-                        if destinationId not in deadEnds and (rvs := f(destinationId, path+[locationId], deadEnds, printsDetails=printsDetails))[0] is not None:
-                            if printsDetails: print("↩︎")
-                            return rvs
-                    
-                    deadEnds.add(locationId)
-                    
-                    if printsDetails: print("No cycle found↩︎")
-                    return (None, deadEnds)
+                        pathIndexOf[destinationId] = len(path)
+                        path.append(destinationId)
+                        stack.append(iter(getDestinations(destinationId)))
+                        break
+                # リンク先を全て辿り終えた場合
                 else:
-                    deadEnds.add(locationId)
+                    if printsDetails: print("No cycle found↩︎")
                     
-                    if printsDetails: print("No Child↩︎")
-                    return (None, deadEnds)
-            else:
-                if printsDetails: print("Cycle found↩︎")
-                return (path[index:] + [locationId], deadEnds)
-        
-        # ある頂点から探索してサイクルが見つからなかったとき
-        if (rvs := f(getMember(pageIds), printsDetails=printsDetails))[0] is None:
-            # 経由した頂点を除いた残りの頂点があればサイクルを探索する
-            if (left := pageIds - rvs[1]):
-                return self.findCycle(left)
-            # 全ての頂点を訪れていればサイクルは存在しない
-            else:
-                return None
-        # サイクルが見つかったとき
-        else:
-            return rvs[0]
+                    stack.pop()
+                    deadEnds.add(locationId := path.pop())
+                    del pathIndexOf[locationId]
+        
+        # 全ての頂点を訪れていればサイクルは存在しない
+        return None
     
     # ハイパーテキスト内のサイクル（closed path）を一つ返す
     def findCycle_nonrec(self) -> Union[list[int], None]:
@@ -721,50 +1167,98 @@ class Server:
         行き先が記法なら return
         あれば append してすすむ
         """
-        left = set(self.getPageIds())
+        # 探索し終えて、そこからはサイクルに至らないことが分かったページ
+        deadEnds: set[int] = set()
         
-        while left:
-            stack = [getMember(left)]
-            path = []
+        for originId in self.getPageIds():
+            if originId in deadEnds:
+                continue
+            
+            # 現在の経路と、経路上のページからその位置への対応（経路上にあるかを O(1) で判定する）
+            # スタックには (ページID, 帰りがけか) を積み、帰りがけの印を取り出したら経路から外す
+            path: list[int] = []
+            pathIndexOf: dict[int, int] = {}
+            stack = [(originId, False)]
             
             while stack:
-                locationId = stack.pop()
+                locationId, isLeaving = stack.pop()
                 
-                # ページが未訪問なら
-                if (index := find(path, locationId)) == -1:
-                    left.discard(locationId)
-                    
-                    if destinationIds := self.getPage(locationId).destinationIds:
-                        stack += list(destinationIds)
-                        path.append(locationId)
-                    else:
-                        continue
-                else:
+                # ページの探索を終えて戻る場合
+                if isLeaving:
+                    path.pop()
+                    del pathIndexOf[locationId]
+                    deadEnds.add(locationId)
+                    continue
+                
+                # 経路上のページに戻ってきたならサイクル
+                if (index := pathIndexOf.get(locationId)) is not None:
                     return path[index:] + [locationId]
+                
+                if locationId in deadEnds:
+                    continue
+                
+                pathIndexOf[locationId] = len(path)
+                path.append(locationId)
+                stack.append((locationId, True))
+                
+                # 存在しないページはリンクを持たないものとする
+                if (page := self.record.get(locationId)) is not None:
+                    stack += ((destinationId, False) for destinationId in page.destinationIds)
         
         return None
     
     def isDAG(self):
-        return self.findCycle() is None
+        return self._cached(("acyclic",), lambda: self.findCycle() is None)
     
     def existsLinkTo404Page(self) -> bool:
-        return bool(mergeSets((hypertext := self.getHypertext()).values()) - self.getPageIds())
+        return bool(self._getEdgeSummary()[2])
     
     def getWCCs(self):
-        links = self.getHyperlinks()
-        
-        for link in self.getHyperlinks():
-            links.add((link[1], link[0]))
-        
-        tmpServer = Server(Server.makePagesFromHyperlinks(links))
-        
-        for isolated in self.getPageIds() - tmpServer.getHypertext().keys():
-            tmpServer.addPage(Page(isolated, set()))
+        def search() -> set[frozenset[int]]:
+            links = self.getHyperlinks()
+            
+            for link in self.getHyperlinks():
+                links.add((link[1], link[0]))
+            
+            tmpServer = Server(Server.makePagesFromHyperlinks(links))
+            
+            for isolated in self.getPageIds() - tmpServer.getHypertext().keys():
+                tmpServer.addPage(Page(isolated, set()))
+            
+            return tmpServer.getSCCs_tarjan()
         
-        return tmpServer.getSCCs()
+        return set(self._cached(("WCCs",), search))
     
-    def isWeaklyConnected(self):
-        return len(self.getWCCs()) == 1
+    # ハイパーテキストが弱連結であるかどうかを返す
+    # 弱連結成分には分解せず、リンクの向きを無視して一つのページから深さ優先探索し、全てのページに到達した時点で打ち切る
+    # 存在しないページへのリンク先も、getWCCs と同様にページとして数える
+    def isWeaklyConnected(self) -> bool:
+        def search() -> bool:
+            pageIds, indexOf, indptr, indices = self._getCSR()
+            tIndptr, tIndices = self._getTransposeCSR()
+            
+            if not pageIds:
+                return False
+            
+            # スタックに積む前に訪問済にするので、同じページが二度積まれることはない
+            visited = bytearray(len(pageIds))
+            visited[0] = 1
+            visitedCount = 1
+            stack = [0]
+            
+            while stack and visitedCount < len(pageIds):
+                i = stack.pop()
+                
+                for neighbors in (indices[indptr[i]:indptr[i+1]], tIndices[tIndptr[i]:tIndptr[i+1]]):
+                    for j in neighbors:
+                        if not visited[j]:
+                            visited[j] = 1
+                            visitedCount += 1
+                            stack.append(j)
+            
+            return visitedCount == len(pageIds)
+        
+        return self._cached(("weaklyConnected",), search)
     
     # ——— スタティックメソッド ———
     
@@ -787,24 +1281,23 @@ class Server:
     # ハイパーテキストを元にページ群を（新たに）生成する
     @staticmethod
     def makePagesFromHypertext(hypertext: dict[int, set[int]]) -> set[Type[Page]]:
+        # Page がリンク先の集合を複製するので、生成したページと元のハイパーテキストは集合を共有しない
         return {Page(pageId, destinationIds) for pageId, destinationIds in hypertext.items()}
     
     # ハイパーリンクの集合を元にページ群を（新たに）生成する
     @staticmethod
     def makePagesFromHyperlinks(hyperlinks: set[tuple[int, int]]) -> set[Type[Page]]:
-        d: dict[int, Page] = dict()
-        
-        for hyperlink in hyperlinks:
-            if hyperlink[0] in d:
-                d[hyperlink[0]].destinationIds.add(hyperlink[1])
-            else:
-                d[hyperlink[0]] = Page(hyperlink[0], {hyperlink[1]})
+        # ページIDごとにリンク先をまとめる（defaultdict により、リンク1本あたりの辞書引きは一度で済む）
+        hypertext: defaultdict[int, set[int]] = defaultdict(set)
         
+        for (startId, endId) in hyperlinks:
+            hypertext[startId].add(endId)
         
-        if pageIdsWithoutOutEdge := {hyperlink[1] for hyperlink in hyperlinks} - {hyperlink[0] for hyperlink in hyperlinks}:
-            d |= {pageId: Page(pageId, set()) for pageId in pageIdsWithoutOutEdge}
+        # リンク先のページも、リンクを持たないページとして登録しておく
+        for endId in {endId for (_, endId) in hyperlinks} - hypertext.keys():
+            hypertext[endId] = set()
         
-        return d.values()
+        return Server.makePagesFromHypertext(hypertext)
     
     @staticmethod
     def makeRandomPages(n: int, p: float, connected: bool = False, permitsLoops = True, printsDetails: bool = False):
@@ -855,7 +1348,13 @@ class Server:
                 wccs.discard(twoWccs[1])
                 wccs.add(twoWccs[0]|twoWccs[1])
         
-        return tmpServer.record.values()
+        # 作業用のサーバをページから切り離してから返す（返したページのリンクの変更が作業用のサーバに伝わらないように）
+        pages = set(tmpServer.record.values())
+        
+        for page in pages:
+            page.servers.discard(tmpServer)
+        
+        return pages
     
     @staticmethod
     def getDestinationIds(hypertext: dict[int, set[int]], pageId: int):
@@ -868,89 +1367,84 @@ class Server:
     
     # リンクをランダムに選択して移動していくロボット
     def randomwalk(self, locationId: int = None,
-                   destinationId: int = None, maxStep: int = None, walk: list[str] = None):
+                   destinationId: int = None, maxStep: int = None):
         if locationId is None:
-            locationId = getRandomMember(self.record)
+            locationId = self.getRandomPageId()
             
         if destinationId is None:
-            destinationId = getRandomMember(self.getDescendantPageIds(locationId))
-        
-        if walk is None:
-            walk = []
+            destinationId = self.getRandomDescendantPageId(locationId)
         
-        print(("→" if walk else "")+str(locationId), end="")
+        print(str(locationId), end="")
         
-        # 現在地が目的地だった場合
-        if locationId == destinationId:
-            print(".")
-            return
-        # 歩数の上限に達した場合
-        elif maxStep is not None and maxStep < 1:
-            print("]")
-            return
-        # それ以上進めない場合
-        elif not (choices := self.getPage(locationId).destinationIds):
-            print("/")
-            return
-        # 現在地が目的地以外のページだった場合
-        else:
-            self.randomwalk(random.choice(list(choices)),
-                            destinationId, (None if maxStep is None else maxStep-1),
-                            walk+[str(locationId)])
+        while True:
+            # 現在地が目的地だった場合
+            if locationId == destinationId:
+                print(".")
+                return
+            # 歩数の上限に達した場合
+            elif maxStep is not None and maxStep < 1:
+                print("]")
+                return
+            # それ以上進めない場合（存在しないページに辿り着いた場合を含む）
+            elif (page := self.record.get(locationId)) is None or (nextId := page.getRandomDestinationId()) is None:
+                print("/")
+                return
+            # 現在地が目的地以外のページだった場合
+            else:
+                locationId = nextId
+                maxStep = None if maxStep is None else maxStep-1
+                
+                print("→"+str(locationId), end="")
     
     # ハイパーリンクを辿って目的のページに辿り着くことを目指すゲーム
     def explore(self, treasure: int = None):
-        # 与えられた str が int 形式に変換可能かを返す
-        def isint(i: str) -> bool:
-            try:
-                int(i)
-            except ValueError:
-                return False
-            else:
-                return True
-        
         # ハイパーリンクを辿る
-        def proceed(locationId: int, walk: list[str] = None) -> int:
-            if walk is None:
-                walk = []
+        def proceed(locationId: int):
+            walk: list[int] = []  # 経由したページ（表示するときにのみ文字列に変換する）
             
-            # 現在地が目的地だった場合
-            if locationId == treasure:
-                print("→".join(walk)+("→" if walk else "")+str(locationId))
-                print(f"You reached page {treasure}!")
-                return 0
-            # 現在地が目的地以外のページだった場合
-            else:
-                print("→".join(walk) + ("→" if walk else "")
-                      + str(locationId) + "→" + str(self.getPage(locationId).destinationIds))
+            # 一つ前のページに戻る（戻れない場合は現在地に留まる）
+            def back(locationId: int) -> int:
+                if not walk:
+                    print("Can't go back. If you want to end the game, type \'quit\'.")
+                    return locationId
+                
+                return walk.pop()
+            
+            # コマンドとその処理の表（処理は現在地を受け取って次の現在地を返し、ゲームを終える場合は None を返す）
+            commands = {"quit": lambda locationId: None,
+                        "back": back}
+            
+            while True:
+                # 現在地が目的地だった場合
+                if locationId == treasure:
+                    print("→".join(map(str, walk))+("→" if walk else "")+str(locationId))
+                    print(f"You reached page {treasure}!")
+                    return
+                
+                # 現在地が目的地以外のページだった場合
+                # 現在地のリンク先は一度だけ引き、表示と移動先の判定の両方に用いる
+                # 存在しないページに辿り着いた場合はリンク先がないものとする
+                destinationIds = page.destinationIds if (page := self.record.get(locationId)) is not None else set()
+                
+                print("→".join(map(str, walk)) + ("→" if walk else "")
+                      + str(locationId) + "→" + str(destinationIds))
                 
                 v = input("Go to: ")
                 
-                # 入力値が"quit"だった場合
-                if v == "quit":
-                    return 1
-                # 入力値が"back"だった場合
-                elif v == "back":
-                    if walk == []:
-                        print("Can't go back. If you want to end the game, type \'quit\'.")
-                        if proceed(locationId, walk): return 1
-                    else:
-                        if proceed(int(walk[-1]), walk[:-1]): return 1
+                # 入力値がコマンドだった場合（一度の辞書引きで振り分ける）
+                if (command := commands.get(v)) is not None:
+                    if (locationId := command(locationId)) is None:
+                        return
                 # 入力値が整数として解釈できなかった場合
                 elif not isint(v):
                     print("Invalid input")
-                    if proceed(locationId, walk): return 1
-                # 入力値が整数として解釈される場合
+                # 入力されたページに現在地からアクセスできない場合（"+3" や " 3" のような表記を含む）
+                elif (destination := int(v)) not in destinationIds:
+                    print(f"Can't move to {v}")
+                # 入力されたページに現在地からアクセスできる場合
                 else:
-                    destination = int(v)
-                    
-                    # 入力されたページに現在地からアクセスできない場合
-                    if destination not in self.getPage(locationId).destinationIds:
-                        print(f"Can't move to {v}")
-                        if proceed(locationId, walk): return 1
-                    # 入力されたページに現在地からアクセスできる場合
-                    else:
-                        if proceed(destination, walk+[str(locationId)]): return 1
+                    walk.append(locationId)
+                    locationId = destination
         
         # 目的地が与えられていない場合はランダムに決定する
         # 到達不能なページも候補にある
@@ -958,7 +1452,7 @@ class Server:
         originId = getRandomMember(self.getStartPageIds())
         
         if treasure is None:
-            treasure = random.choice(list(self.getDescendantPageIds(originId)))
+            treasure = self.getRandomDescendantPageId(originId)
         
         print(f"Search for page {treasure}!")
         proceed(originId)
@@ -977,6 +1471,49 @@ class Server:
 
 
 if __name__ == "__main__":
+    # 各サーバについて表示する解析の一覧（表示名, 結果を求める関数）
+    # 解析結果はハイパーテキストが変更されるまでキャッシュされるので、表の中で同じ解析を繰り返しても再計算されない
+    analyses = [
+        ("Pages", Server.getPageIds),
+        ("Start pages", Server.getStartPageIds),
+        ("End pages", Server.getEndPageIds),
+        ("Sink pages", Server.getSinkPageIds),
+        ("Source pages", Server.getSourcePageIds),
+        ("Isolated pages", Server.getIsolatedPageIds),
+        ("Root page", Server.getRootPageId),
+        ("Wccs", lambda server: len(server.getWCCs())),
+        ("Weakly connected", Server.isWeaklyConnected),
+        ("Sccs", lambda server: len(server.getSCCs())),
+        ("SCCs (nonrec)", lambda server: len(server.getSccs_nonrec())),
+        ("SCCs (tarjan)", lambda server: len(server.getSCCs_tarjan())),
+        ("SCC variants agree", lambda server: server.getSCCs() == server.getSccs_nonrec() == server.getSCCs_tarjan()),
+        ("Strongly connected", Server.isStronglyConnected),
+        ("Cycle", Server.findCycle),
+        ("Cycle (nonrec)", Server.findCycle_nonrec),
+        ("is DAG", Server.isDAG),
+        ("SCC contraction", Server.SCCContracted),
+        ("contraction is DAG", lambda server: Server(Server.makePagesFromHypertext(server.SCCContracted())).isDAG()),
+        ("soundness", lambda server: not server.existsLinkTo404Page()),
+        ("transitif reduction", Server.transitiveReduction),
+    ]
+    
+    # サーバごとに異なる行（到達可能性と距離を調べるページ、追加の行）を受け取り、解析結果を一覧表示する
+    def printAnalyses(server: Server, descendantsOf: int, distanceBetween: tuple[int, int],
+                      extras: list[tuple[str, any]] = ()):
+        startId, endId = distanceBetween
+        
+        print(f"{'hypertext':19}:", server.getSortedHypertext())
+        
+        for (label, value) in extras:
+            print(f"{label:19}:", value)
+        
+        print(f"{'hyperlinks':19}:", server.getSortedHyperlinks())
+        print(f"{f'Descendants of {descendantsOf}':19}:", server.getDescendantPageIds(descendantsOf))
+        print(f"{f'{startId} to {endId}':19}:", server.getDistance(startId, endId), "links")
+        
+        for (label, analysis) in analyses:
+            print(f"{label:19}:", analysis(server))
+    
     print("""
         0   8 ← 10
       ↙︎ ⇅     ↘︎ ↑
@@ -1008,28 +1545,7 @@ if __name__ == "__main__":
                      Page(10, {8}),
                      Page(11, set()),
                      Page(12, {5, 9})})
-    print("hypertext          :", server.getSortedHypertext())
-    print("hyperlinks         :", server.getSortedHyperlinks())
-    print("Descendants of 7   :", server.getDescendantPageIds(7))
-    print("12 to 1            :", server.getDistance(12, 1), "links")
-    print("Pages              :", server.getPageIds())
-    print("Start pages        :", server.getStartPageIds())
-    print("End pages          :", server.getEndPageIds())
-    print("Sink pages         :", server.getSinkPageIds())
-    print("Source pages       :", server.getSourcePageIds())
-    print("Isolated pages     :", server.getIsolatedPageIds())
-    print("Wccs               :", len(server.getWCCs()))
-    print("Weakly connected   :", server.isWeaklyConnected())
-    print("Sccs               :", len(server.getSCCs()))
-    print("SCCs (nonrec)      :", len(server.getSccs_nonrec()))
-    print("Strongly connected :", server.isStronglyConnected())
-    print("Cycle              :", server.findCycle())
-    print("Cycle (nonrec)     :", server.findCycle_nonrec())
-    print("is DAG             :", server.isDAG())
-    print("SCC contraction    :", c := server.SCCContracted())
-    print("contraction is DAG :", Server(Server.makePagesFromHypertext(c)).isDAG())
-    print("soundness          :", not server.existsLinkTo404Page())
-    print("transitif reduction:", server.transitiveReduction())
+    printAnalyses(server, 7, (12, 1))
     
     print("\n———————————\n")
     
@@ -1059,28 +1575,7 @@ if __name__ == "__main__":
     server.getPage(5).deleteLink(12)
     server.getPage(7).addLink(6)
     server.addPage(Page(13, {6}))
-    print("hypertext          :", server.getSortedHypertext())
-    print("hyperlinks         :", server.getSortedHyperlinks())
-    print("Descendants of 7   :", server.getDescendantPageIds(7))
-    print("12 to 1            :", server.getDistance(12, 1), "links")
-    print("Pages              :", server.getPageIds())
-    print("Start pages        :", server.getStartPageIds())
-    print("End pages          :", server.getEndPageIds())
-    print("Sink pages         :", server.getSinkPageIds())
-    print("Source pages       :", server.getSourcePageIds())
-    print("Isolated pages     :", server.getIsolatedPageIds())
-    print("Wccs               :", len(server.getWCCs()))
-    print("Weakly connected   :", server.isWeaklyConnected())
-    print("Sccs               :", len(server.getSCCs()))
-    print("SCCs (nonrec)      :", len(server.getSccs_nonrec()))
-    print("Strongly connected :", server.isStronglyConnected())
-    print("Cycle              :", server.findCycle())
-    print("Cycle (nonrec)     :", server.findCycle_nonrec())
-    print("is DAG             :", server.isDAG())
-    print("SCC contraction    :", c := server.SCCContracted())
-    print("contraction is DAG :", Server(Server.makePagesFromHypertext(c)).isDAG())
-    print("soundness          :", not server.existsLinkTo404Page())
-    print("transitif reduction:", server.transitiveReduction())
+    printAnalyses(server, 7, (12, 1))
     
     print("\n———————————\n")
     
@@ -1103,29 +1598,8 @@ if __name__ == "__main__":
     """)
     
     server_ = Server(Server.makePagesFromHypertext(server.getInducedSubgraph(13)))
-    print("hypertext          :", server_.getSortedHypertext())
-    print("hypertext (nonrec) :", Server(Server.makePagesFromHypertext(server.getInducedSubgraph_nonrec(13))).getSortedHypertext())
-    print("hyperlinks         :", server_.getSortedHyperlinks())
-    print("Descendants of 7   :", server_.getDescendantPageIds(7))
-    print("13 to 5            :", server_.getDistance(13, 5), "links")
-    print("Pages              :", server_.getPageIds())
-    print("Start pages        :", server_.getStartPageIds())
-    print("End pages          :", server_.getEndPageIds())
-    print("Sink pages         :", server_.getSinkPageIds())
-    print("Source pages       :", server_.getSourcePageIds())
-    print("Isolated pages     :", server_.getIsolatedPageIds())
-    print("Wccs               :", len(server_.getWCCs()))
-    print("Weakly connected   :", server_.isWeaklyConnected())
-    print("Sccs               :", len(server_.getSCCs()))
-    print("SCCs (nonrec)      :", len(server_.getSccs_nonrec()))
-    print("Strongly connected :", server_.isStronglyConnected())
-    print("Cycle              :", server_.findCycle())
-    print("Cycle (nonrec)     :", server_.findCycle_nonrec())
-    print("is DAG             :", server_.isDAG())
-    print("SCC contraction    :", c := server_.SCCContracted())
-    print("contraction is DAG :", Server(Server.makePagesFromHypertext(c)).isDAG())
-    print("soundness          :", not server_.existsLinkTo404Page())
-    print("transitif reduction:", server_.transitiveReduction())
+    printAnalyses(server_, 7, (13, 5),
+                  extras=[("hypertext (nonrec)", Server(Server.makePagesFromHypertext(server.getInducedSubgraph_nonrec(13))).getSortedHypertext())])
     
     print("\n———————————\n")
     
@@ -1151,28 +1625,7 @@ if __name__ == "__main__":
                          Page(4, {2, 5}),
                          Page(5, {6}),
                          Page(6, {4})})
-    print("hypertext          :", server2.getSortedHypertext())
-    print("hyperlinks         :", server2.getSortedHyperlinks())
-    print("Descendants of 5   :", server2.getDescendantPageIds(5))
-    print("5 to 3             :", server2.getDistance(5, 3), "links")
-    print("Pages              :", server2.getPageIds())
-    print("Start pages        :", server2.getStartPageIds())
-    print("End pages          :", server2.getEndPageIds())
-    print("Sink pages         :", server2.getSinkPageIds())
-    print("Source pages       :", server2.getSourcePageIds())
-    print("Isolated pages     :", server2.getIsolatedPageIds())
-    print("Wccs               :", len(server2.getWCCs()))
-    print("Weakly connected   :", server2.isWeaklyConnected())
-    print("Sccs               :", len(server2.getSCCs()))
-    print("SCCs (nonrec)      :", len(server2.getSccs_nonrec()))
-    print("Strongly connected :", server2.isStronglyConnected())
-    print("Cycle              :", server2.findCycle())
-    print("Cycle (nonrec)     :", server2.findCycle_nonrec())
-    print("is DAG             :", server2.isDAG())
-    print("SCC contraction    :", c := server2.SCCContracted())
-    print("contraction is DAG :", Server(Server.makePagesFromHypertext(c)).isDAG())
-    print("soundness          :", not server2.existsLinkTo404Page())
-    print("transitif reduction:", server2.transitiveReduction())
+    printAnalyses(server2, 5, (5, 3))
     
     print("\n———————————\n")
     
@@ -1185,28 +1638,7 @@ if __name__ == "__main__":
     edges5 = Server.splitWalksIntoEdges({(0, 1, 2, 3), (2, 4)})
     server5 = Server(Server.makePagesFromHyperlinks(edges5))
     server5.addPage(Page(5, set()))
-    print("hypertext          :", server5.getSortedHypertext())
-    print("hyperlinks         :", server5.getSortedHyperlinks())
-    print("Descendants of 3   :", server5.getDescendantPageIds(3))
-    print("3 to 1             :", server5.getDistance(3, 1), "links")
-    print("Pages              :", server5.getPageIds())
-    print("Start pages        :", server5.getStartPageIds())
-    print("End pages          :", server5.getEndPageIds())
-    print("Sink pages         :", server5.getSinkPageIds())
-    print("Source pages       :", server5.getSourcePageIds())
-    print("Isolated pages     :", server5.getIsolatedPageIds())
-    print("Wccs               :", len(server5.getWCCs()))
-    print("Weakly connected   :", server5.isWeaklyConnected())
-    print("Sccs               :", len(server5.getSCCs()))
-    print("SCCs (nonrec)      :", len(server5.getSccs_nonrec()))
-    print("Strongly connected :", server5.isStronglyConnected())
-    print("Cycle              :", server5.findCycle())
-    print("Cycle (nonrec)     :", server5.findCycle_nonrec())
-    print("is DAG             :", server5.isDAG())
-    print("SCC contraction    :", c := server5.SCCContracted())
-    print("contraction is DAG :", Server(Server.makePagesFromHypertext(c)).isDAG())
-    print("soundness          :", not server5.existsLinkTo404Page())
-    print("transitif reduction:", server5.transitiveReduction())
+    printAnalyses(server5, 3, (3, 1))
     
     print("\n———————————\n")
     
@@ -1215,28 +1647,7 @@ if __name__ == "__main__":
           """)
     
     serverr = Server(Server.makeRandomPages(10, 0.1, False, False))
-    print("hypertext          :", serverr.getSortedHypertext())
-    print("hyperlinks         :", serverr.getSortedHyperlinks())
-    print("Descendants of 3   :", serverr.getDescendantPageIds(3))
-    print("3 to 1             :", serverr.getDistance(3, 1), "links")
-    print("Pages              :", serverr.getPageIds())
-    print("Start pages        :", serverr.getStartPageIds())
-    print("End pages          :", serverr.getEndPageIds())
-    print("Sink pages         :", serverr.getSinkPageIds())
-    print("Source pages       :", serverr.getSourcePageIds())
-    print("Isolated pages     :", serverr.getIsolatedPageIds())
-    print("Wccs               :", len(serverr.getWCCs()))
-    print("Weakly connected   :", serverr.isWeaklyConnected())
-    print("Sccs               :", len(serverr.getSCCs()))
-    print("SCCs (nonrec)      :", len(serverr.getSccs_nonrec()))
-    print("Strongly connected :", serverr.isStronglyConnected())
-    print("Cycle              :", serverr.findCycle())
-    print("Cycle (nonrec)     :", serverr.findCycle_nonrec())
-    print("is DAG             :", serverr.isDAG())
-    print("SCC contraction    :", c := serverr.SCCContracted())
-    print("contraction is DAG :", Server(Server.makePagesFromHypertext(c)).isDAG())
-    print("soundness          :", not serverr.existsLinkTo404Page())
-    print("transitif reduction:", serverr.transitiveReduction())
+    printAnalyses(serverr, 3, (3, 1))
     
     # for _ in range(10):
     #     server.randomwalk(12, 3, 14)